@@ -1,111 +1,434 @@
 """
 app.py
 ------
-Flask backend for the Explainable Spam & Phishing Detector.
+Quart (async Flask) backend for the Explainable Spam & Phishing Detector.
 
 HOW IT WORKS (simple terms):
-1. The app loads the pre-trained ML model and vectorizer on startup.
+1. The app loads the pre-trained ML model (exported by train.py) on startup.
 2. When a user submits a message via the web UI:
    - The message is vectorized (converted to numbers)
    - The model predicts: spam or ham
    - The confidence score (%) is calculated
    - An explainability engine checks for suspicious keywords & patterns
 3. All results are sent back as JSON to the frontend.
+   Repeated messages are answered from an in-memory cache.
 
 Routes:
    GET  /          → serves the main HTML page
    POST /predict   → accepts JSON message, returns prediction + explanation
+
+The routes are async: while one request's message is being analyzed on a
+worker thread, the event loop keeps reading and answering other requests.
 """
 
+import asyncio
 import re
-import pickle
+import joblib
 import os
-from flask import Flask, request, jsonify, render_template
+import string
+import queue
+import threading
+from collections import Counter
+from itertools import chain
+from collections.abc import Mapping
+from concurrent.futures import Future
+from functools import lru_cache
+from types import MappingProxyType
+import mmh3
+import numpy as np
+import orjson
+from quart import Quart, request, jsonify, render_template
+from quart.json.provider import JSONProvider
 
 # ─────────────────────────────────────────────
-# Initialize Flask app
+# Initialize Quart app (same API as Flask, but async)
 # ─────────────────────────────────────────────
-app = Flask(__name__)
+app = Quart(__name__)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Encode/decode JSON with orjson (written in Rust, several times faster
+    than the standard json module) for every jsonify() response and
+    request.get_json() call.
+    """
+
+    mimetype = "application/json"
+
+    @staticmethod
+    def default(obj):
+        # Read-only mappings (e.g. the shared scammer-intent payloads)
+        if isinstance(obj, Mapping):
+            return dict(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # orjson already produces UTF-8 bytes — send them as-is
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default), mimetype=self.mimetype
+        )
+
+
+app.json = OrjsonProvider(app)
 
 # ─────────────────────────────────────────────
-# Load the trained model and vectorizer
+# Load the trained model
 # ─────────────────────────────────────────────
-MODEL_PATH      = "model.pkl"
-VECTORIZER_PATH = "vectorizer.pkl"
+MODEL_PATH = "model.joblib"
 
-if not os.path.exists(MODEL_PATH) or not os.path.exists(VECTORIZER_PATH):
+if not os.path.exists(MODEL_PATH):
     raise FileNotFoundError(
-        "❌ model.pkl or vectorizer.pkl not found!\n"
+        "❌ model.joblib not found!\n"
         "   Please run: python train.py   first."
     )
 
-with open(MODEL_PATH, "rb") as f:
-    model = pickle.load(f)
+# The export is plain Python/numpy data (see train.py), so loading it does
+# NOT import scikit-learn. The sections below turn it into the app's own
+# compact tables ONCE and then drop it. (Under gunicorn with preload_app,
+# those tables are built before the workers fork, so workers share them
+# until written.)
+model = joblib.load(MODEL_PATH)
+
+print("[OK] Model loaded successfully.")
+
+# ─────────────────────────────────────────────
+# Model input (word counts)
+# ─────────────────────────────────────────────
 
-with open(VECTORIZER_PATH, "rb") as f:
-    vectorizer = pickle.load(f)
+# The model was trained on HASHED word counts (see train.py): instead of a
+# vocabulary, each word is filed under column
+#     abs(MurmurHash3(word)) % N_FEATURES
+# so the model's input is just the count of each hashed word in the message.
+# We hash exactly the way scikit-learn's HashingVectorizer does (same
+# MurmurHash3, seed 0, signed 32-bit), so no scikit-learn import is needed.
+# Those counts are collected during the single message scan (see
+# analyze_message) as a small {hashed index: count} dict per message.
+N_FEATURES = model["n_features"]                # 4,096 hashed word slots
+STOP_WORDS = frozenset(model["stop_words"])     # dropped before hashing
+_INT32_MIN = -2 ** 31
+
+# The text settings analyze_message reproduces by hand. If train.py's
+# vectorizer ever changes, the hashed counts would silently stop matching
+# what the model was trained on — so refuse to start instead.
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"   # lowercased words of 2+ letters
+EXPECTED_VECTORIZER_SETTINGS = {
+    "token_pattern":  TOKEN_PATTERN,
+    "lowercase":      True,
+    "alternate_sign": False,
+    "norm":           None,
+}
+
+for setting, expected in EXPECTED_VECTORIZER_SETTINGS.items():
+    if model.get(setting, "<missing>") != expected:
+        raise ValueError(
+            f"❌ model.joblib was trained with {setting}={model.get(setting, '<missing>')!r}, "
+            f"but app.py reads messages with {setting}={expected!r}.\n"
+            "   Please run: python train.py   again (or update app.py)."
+        )
+
+
+def feature_index(word: str) -> int:
+    """Hashed column of a word, identical to HashingVectorizer's."""
+    h = mmh3.hash(word, 0)
+    if h == _INT32_MIN:  # abs() would overflow int32; match scikit-learn
+        return (2 ** 31 - 1 - (N_FEATURES - 1)) % N_FEATURES
+    return abs(h) % N_FEATURES
+
+
+# ─────────────────────────────────────────────
+# Fast Naive Bayes scoring
+# ─────────────────────────────────────────────
+
+# For Multinomial Naive Bayes, scoring a message is just:
+#     log P(class) + sum over words of (count × log P(word | class))
+# so we turn those two tables from the export into compact float32 arrays
+# ONCE, and do the maths ourselves with numpy.
+# The word table is stored transposed, one row per hashed word slot, so a
+# word's log-probabilities for both classes sit side by side in memory and
+# scoring is a plain gather of the few rows a message actually uses.
+CLASSES            = model["classes"]                                 # ["ham", "spam"]
+CLASS_LOG_PRIOR    = model["class_log_prior"].astype(np.float32)      # shape (2,)
+feature_log_prob_t = np.ascontiguousarray(
+    model["feature_log_prob"].T, dtype=np.float32                     # shape (N_FEATURES, 2)
+)
+
+# The word table is then quantized to int16 (half the bytes of float32) with
+# one scale factor per class: log_prob ≈ FEATURE_LOG_PROB_Q × FEATURE_LOG_PROB_SCALE.
+# Scores are summed as integers and scaled back once per message. The
+# rounding error is far too small to flip a prediction.
+# Only the int16 table is kept; the float32 one is dropped once converted.
+FEATURE_LOG_PROB_SCALE = np.abs(feature_log_prob_t).max(axis=0) / np.iinfo(np.int16).max
+FEATURE_LOG_PROB_Q     = np.round(feature_log_prob_t / FEATURE_LOG_PROB_SCALE).astype(np.int16)
+del feature_log_prob_t
+
+# Everything needed from the export now lives in the tables above
+del model
+
+
+def fast_predict_proba(rows: list):
+    """
+    Return class probabilities for a batch of messages, given their word
+    counts ({hashed index: count}, one dict per message).
+
+    Same result as scikit-learn's MultinomialNB.predict_proba (up to
+    the int16 rounding), but it only touches the words present: gather
+    their rows of the quantized log-prob table, weight them by count, add
+    them up per message, then scale back to log-probabilities.
+    """
+    sizes = [len(row) for row in rows]
+    total = sum(sizes)
+    indices = np.fromiter(chain.from_iterable(rows), dtype=np.intp, count=total)
+    counts = np.fromiter(
+        chain.from_iterable(row.values() for row in rows), dtype=np.int64, count=total
+    )
+    # Which message each gathered word belongs to
+    message_ids = np.repeat(np.arange(len(rows)), sizes)
+
+    totals = np.zeros((len(rows), len(CLASSES)), dtype=np.int64)
+    np.add.at(totals, message_ids, FEATURE_LOG_PROB_Q[indices] * counts[:, None])
+    scores = CLASS_LOG_PRIOR + totals * FEATURE_LOG_PROB_SCALE
+
+    # Softmax (subtract the max first so exp() can't overflow)
+    scores -= scores.max(axis=1, keepdims=True)
+    probabilities = np.exp(scores)
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+    return probabilities
 
-print("[OK] Model and vectorizer loaded successfully.")
 
 # ─────────────────────────────────────────────
 # Explainability Engine
 # ─────────────────────────────────────────────
 
-# Common spam/phishing keywords (used for highlighting + explanations)
-SPAM_KEYWORDS = [
+# Common spam/phishing keywords (used for highlighting + explanations).
+# The *_ORDERED lists fix the order explanations are shown in; the frozensets
+# built from them are what messages are actually matched against.
+SPAM_KEYWORDS_ORDERED = [
     "free", "win", "winner", "click", "offer", "urgent", "lottery",
     "now", "prize", "cash", "reward", "claim", "selected", "congratulations",
     "exclusive", "limited", "guaranteed", "act", "earn", "money",
     "bonus", "upgrade", "membership", "discount", "cheap", "buy",
     "call", "text", "subscribe", "unsubscribe", "credit", "loan"
 ]
+SPAM_KEYWORDS = frozenset(SPAM_KEYWORDS_ORDERED)
 
-URGENCY_WORDS = [
+URGENCY_WORDS_ORDERED = [
     "urgent", "immediately", "now", "today", "expires", "limited", "hurry",
     "act", "fast", "quick", "instant", "deadline", "last chance", "expiring"
 ]
+URGENCY_WORDS = frozenset(URGENCY_WORDS_ORDERED)
+
+# Each keyword's position in its *_ORDERED list, so the few keywords a
+# message actually hits can be put in display order without walking the
+# whole list on every request.
+SPAM_KEYWORD_RANK = {keyword: rank for rank, keyword in enumerate(SPAM_KEYWORDS_ORDERED)}
+URGENCY_WORD_RANK = {word: rank for rank, word in enumerate(URGENCY_WORDS_ORDERED)}
+
+# Explanation text for every keyword, built once here rather than
+# formatted again each time a message contains the keyword
+SPAM_KEYWORD_EXPLANATIONS = {
+    keyword: f"⚠️ Contains suspicious keyword: <b>{keyword}</b>"
+    for keyword in SPAM_KEYWORDS_ORDERED
+}
+URGENCY_WORD_EXPLANATIONS = {
+    word: f"🚨 Contains urgency word: <b>{word}</b>"
+    for word in URGENCY_WORDS_ORDERED
+}
+
+# Messages are user-controlled, so every pattern below uses possessive
+# quantifiers (++, *+, {2,}+): once a run is matched the regex engine never
+# backtracks into it, which keeps matching linear-time even on hostile input.
+# Longer messages are rejected outright (see MAX_MESSAGE_LENGTH).
 
 # URL pattern to detect phishing links
 URL_PATTERN = re.compile(
-    r"(https?://[^\s]+|www\.[^\s]+|\b\w+\.(com|net|org|xyz|info|biz|ru|tk|click)[^\s]*)",
+    r"(https?://[^\s]++|www\.[^\s]++|\b\w++\.(com|net|org|xyz|info|biz|ru|tk|click)[^\s]*+)",
     re.IGNORECASE
 )
 
 # Symbols that appear frequently in spam (currency, exclamation, etc.)
-EXCESSIVE_SYMBOL_PATTERN = re.compile(r"[!£$€@#%&*]{2,}")
+EXCESSIVE_SYMBOL_PATTERN = re.compile(r"[!£$€@#%&*]{2,}+")
+
+# Byte tables for the ALL CAPS check. Deleting every byte that is NOT a
+# letter/space, then every byte that is NOT uppercase, and taking lengths
+# counts them in C, instead of testing characters one at a time.
+_ALL_BYTES          = bytes(range(256))
+NON_UPPERCASE_BYTES = _ALL_BYTES.translate(None, string.ascii_uppercase.encode())
+NON_LETTER_BYTES    = _ALL_BYTES.translate(None, (string.ascii_letters + " ").encode())
 
 # ─────────────────────────────────────────────
 # Scammer Intent Detection Patterns
 # ─────────────────────────────────────────────
 
 # Patterns to detect what the scammer wants to achieve
-MONEY_THEFT_KEYWORDS = [
+MONEY_THEFT_KEYWORDS = frozenset({
     "win", "winner", "prize", "cash", "money", "reward", "claim", "payment",
     "transfer", "deposit", "account", "loan", "credit", "debt", "fee",
     "pay", "bitcoin", "cryptocurrency", "investment", "profit", "earn"
-]
+})
 
-DATA_THEFT_KEYWORDS = [
+DATA_THEFT_KEYWORDS = frozenset({
     "verify", "confirm", "update", "security", "password", "account",
     "login", "credentials", "personal", "information", "details", "ssn",
     "social security", "card number", "cvv", "pin", "identity", "verification"
-]
+})
 
-PANIC_KEYWORDS = [
+PANIC_KEYWORDS = frozenset({
     "urgent", "immediately", "suspend", "suspended", "blocked", "locked",
     "compromised", "unauthorized", "fraud", "fraudulent", "alert", "warning",
     "expires", "expired", "deadline", "last chance", "act now", "emergency"
-]
+})
 
-MALWARE_KEYWORDS = [
+MALWARE_KEYWORDS = frozenset({
     "click", "download", "install", "update", "software", "antivirus",
     "security update", "patch", "link", "attachment", "file"
-]
+})
+
+# The possible intents are fixed, so each is built once here and every
+# response reuses the same object. MappingProxyType makes them read-only,
+# so no caller can accidentally change the payload for everyone else.
+MONEY_THEFT_INTENT = MappingProxyType({
+    "icon": "💰",
+    "goal": "Steal Money",
+    "description": "Scammer wants you to send money or provide payment information"
+})
+
+DATA_THEFT_INTENT = MappingProxyType({
+    "icon": "🔐",
+    "goal": "Steal Personal Data",
+    "description": "Scammer is trying to harvest your login credentials or personal information"
+})
+
+PANIC_INTENT = MappingProxyType({
+    "icon": "😱",
+    "goal": "Create Panic",
+    "description": "Scammer uses urgency and fear to make you act without thinking"
+})
+
+MALWARE_INTENT = MappingProxyType({
+    "icon": "🦠",
+    "goal": "Install Malware",
+    "description": "Scammer wants you to click a link or download malicious software"
+})
+
+# Used when a message is spam but no specific intent was detected
+GENERIC_INTENT = MappingProxyType({
+    "icon": "🎯",
+    "goal": "Deceptive Intent",
+    "description": "Scammer is attempting to deceive or manipulate you"
+})
 
+# ─────────────────────────────────────────────
+# Keyword Index (built once at startup)
+# ─────────────────────────────────────────────
+
+# Multi-word phrases ("last chance", "act now", ...) indexed by their first
+# word, with the phrase lengths (in words) that start with it.
+PHRASE_LENGTHS = {}
+for _keyword in (SPAM_KEYWORDS | URGENCY_WORDS | MONEY_THEFT_KEYWORDS |
+                 DATA_THEFT_KEYWORDS | PANIC_KEYWORDS | MALWARE_KEYWORDS):
+    _parts = _keyword.split()
+    if len(_parts) > 1:
+        PHRASE_LENGTHS.setdefault(_parts[0], set()).add(len(_parts))
+
+PHRASE_STARTS = frozenset(PHRASE_LENGTHS)
+
+WORD_PATTERN = re.compile(r"\b\w++\b")
+
+# One combined pattern for URLs, symbol runs and words, so the message is
+# walked by the regex engine a single time. URLs are tried first so a link
+# is recognised as a whole; its words are then picked out separately.
+MESSAGE_PATTERN = re.compile(
+    rf"(?P<url>{URL_PATTERN.pattern})"
+    rf"|(?P<symbols>{EXCESSIVE_SYMBOL_PATTERN.pattern})"
+    r"|(?P<word>\w++)",
+    re.IGNORECASE
+)
 
-def explain_message(message: str):
+
+def scan_message(message: str):
+    """
+    Walk the message ONCE and return:
+      - words       : list of lowercased words, in order
+      - has_url     : True if the message contains a link
+      - has_symbols : True if it contains a run of symbols ($$, !!, ££)
+    """
+    words = []
+    has_url = False
+    has_symbols = False
+
+    text = message.lower()
+    for match in MESSAGE_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == "word":
+            word = match.group()
+            words.append(word)
+            # A link glued to the word before it ("athttp://…") is swallowed
+            # by the word, so look for one from here on
+            if not has_url and ("http" in word or "www" in word):
+                has_url = URL_PATTERN.search(text, match.start()) is not None
+        elif kind == "url":
+            has_url = True
+            link = match.group()
+            words.extend(WORD_PATTERN.findall(link))
+            # The link swallows any symbol run inside it ("/$$$"), so check it too
+            if EXCESSIVE_SYMBOL_PATTERN.search(link):
+                has_symbols = True
+        else:
+            has_symbols = True
+
+    return words, has_url, has_symbols
+
+
+def message_terms(words: list):
     """
-    Analyze a message and return:
+    Return the set of words AND multi-word phrases in a message, so every
+    keyword list can be checked with a single set intersection.
+
+    Keywords only match whole words, so "now" is not found inside "know".
+    """
+    terms = set(words)
+
+    # Most messages contain no phrase start word at all — skip the walk.
+    if PHRASE_STARTS.isdisjoint(terms):
+        return terms
+
+    for i, word in enumerate(words):
+        for length in PHRASE_LENGTHS.get(word, ()):
+            terms.add(" ".join(words[i:i + length]))
+
+    return terms
+
+
+def analyze_message(message: str):
+    """
+    Scan the message ONCE and return everything both the ML model and the
+    explainability engine need:
+      - word_counts : {hashed index: count} — the model's input
+      - terms       : set of words + keyword phrases (see message_terms)
+      - has_url     : True if the message contains a link
+      - has_symbols : True if it contains a run of symbols ($$, !!, ££)
+
+    The model's tokens (words of 2+ letters, minus stop words) are taken
+    straight from the scanned words, so no second tokenizing pass is needed.
+    """
+    words, has_url, has_symbols = scan_message(message)
+    word_counts = Counter(
+        feature_index(word) for word in words
+        if len(word) > 1 and word not in STOP_WORDS
+    )
+    return word_counts, message_terms(words), has_url, has_symbols
+
+
+def explain_message(message: str, terms: set, has_url: bool, has_symbols: bool):
+    """
+    Analyze a message (already scanned by analyze_message) and return:
       - suspicious_words : list of flagged words found in the message
       - explanations     : list of human-readable reason strings
 
@@ -113,49 +436,47 @@ def explain_message(message: str):
     We simply check the message text against known spam patterns.
     This is a RULE-BASED system — no ML needed here, pure logic.
     """
-    msg_lower = message.lower()
-    words_in_msg = re.findall(r"\b\w+\b", msg_lower)
+    spam_hits = SPAM_KEYWORDS & terms
+    # Urgency words already reported as spam keywords are not repeated
+    urgency_hits = (URGENCY_WORDS & terms) - spam_hits
 
-    suspicious_words = []
+    # A dict works as an ordered set: keys keep first-seen order and a
+    # repeated word is simply stored once.
+    suspicious_words = {}
     explanations = []
 
     # --- Check 1: Spam keywords ---
-    for keyword in SPAM_KEYWORDS:
-        if keyword in words_in_msg:
-            if keyword not in suspicious_words:
-                suspicious_words.append(keyword)
-                explanations.append(f"⚠️ Contains suspicious keyword: <b>{keyword}</b>")
+    for keyword in sorted(spam_hits, key=SPAM_KEYWORD_RANK.__getitem__):
+        suspicious_words[keyword] = None
+        explanations.append(SPAM_KEYWORD_EXPLANATIONS[keyword])
 
     # --- Check 2: Urgency words ---
-    for word in URGENCY_WORDS:
-        if word in msg_lower and word not in suspicious_words:
-            suspicious_words.append(word)
-            explanations.append(f"🚨 Contains urgency word: <b>{word}</b>")
+    for word in sorted(urgency_hits, key=URGENCY_WORD_RANK.__getitem__):
+        suspicious_words[word] = None
+        explanations.append(URGENCY_WORD_EXPLANATIONS[word])
 
     # --- Check 3: URLs (phishing indicator) ---
-    urls_found = URL_PATTERN.findall(message)
-    if urls_found:
+    if has_url:
         explanations.append("🔗 Contains a URL — possible phishing link detected")
         # Add 'url' as a suspicious marker for frontend highlighting
-        suspicious_words.append("http")
-        suspicious_words.append("www")
+        suspicious_words["http"] = None
+        suspicious_words["www"] = None
 
     # --- Check 4: Excessive symbols ---
-    if EXCESSIVE_SYMBOL_PATTERN.search(message):
+    if has_symbols:
         explanations.append("💲 Contains excessive symbols ($$, !!, ££) — common in spam")
 
     # --- Check 5: ALL CAPS check ---
-    words_only = re.sub(r"[^a-zA-Z ]", "", message)
-    if words_only and sum(1 for c in words_only if c.isupper()) / max(len(words_only), 1) > 0.5:
+    # Ratio of uppercase letters among the message's A–Z letters and spaces
+    letters = message.encode("ascii", "ignore").translate(None, NON_LETTER_BYTES)
+    uppercase = letters.translate(None, NON_UPPERCASE_BYTES)
+    if letters and len(uppercase) / len(letters) > 0.5:
         explanations.append("🔠 Message uses excessive CAPS — typical spam behavior")
 
-    # Remove duplicates while preserving order
-    suspicious_words = list(dict.fromkeys(suspicious_words))
-
-    return suspicious_words, explanations
+    return list(suspicious_words), explanations
 
 
-def detect_scammer_intent(message: str, prediction: str):
+def detect_scammer_intent(terms: set, urls_present: bool, prediction: str):
     """
     Reverse Intent Detection: Analyze what the scammer is trying to achieve.
     
@@ -165,69 +486,180 @@ def detect_scammer_intent(message: str, prediction: str):
     if prediction != "spam":
         return []
     
-    msg_lower = message.lower()
     intents = []
     
     # Check for money theft intent
-    money_matches = sum(1 for word in MONEY_THEFT_KEYWORDS if word in msg_lower)
+    money_matches = len(MONEY_THEFT_KEYWORDS & terms)
     if money_matches >= 2:
-        intents.append({
-            "icon": "💰",
-            "goal": "Steal Money",
-            "description": "Scammer wants you to send money or provide payment information"
-        })
+        intents.append(MONEY_THEFT_INTENT)
     
     # Check for data theft intent
-    data_matches = sum(1 for word in DATA_THEFT_KEYWORDS if word in msg_lower)
+    data_matches = len(DATA_THEFT_KEYWORDS & terms)
     if data_matches >= 2:
-        intents.append({
-            "icon": "🔐",
-            "goal": "Steal Personal Data",
-            "description": "Scammer is trying to harvest your login credentials or personal information"
-        })
+        intents.append(DATA_THEFT_INTENT)
     
     # Check for panic creation intent
-    panic_matches = sum(1 for word in PANIC_KEYWORDS if word in msg_lower)
+    panic_matches = len(PANIC_KEYWORDS & terms)
     if panic_matches >= 2:
-        intents.append({
-            "icon": "😱",
-            "goal": "Create Panic",
-            "description": "Scammer uses urgency and fear to make you act without thinking"
-        })
+        intents.append(PANIC_INTENT)
     
     # Check for malware installation intent
-    malware_matches = sum(1 for word in MALWARE_KEYWORDS if word in msg_lower)
-    urls_present = bool(URL_PATTERN.search(message))
+    malware_matches = len(MALWARE_KEYWORDS & terms)
     if malware_matches >= 2 and urls_present:
-        intents.append({
-            "icon": "🦠",
-            "goal": "Install Malware",
-            "description": "Scammer wants you to click a link or download malicious software"
-        })
+        intents.append(MALWARE_INTENT)
     
     # If spam but no specific intent detected, add a generic one
     if not intents:
-        intents.append({
-            "icon": "🎯",
-            "goal": "Deceptive Intent",
-            "description": "Scammer is attempting to deceive or manipulate you"
-        })
+        intents.append(GENERIC_INTENT)
     
     return intents
 
 
+# ─────────────────────────────────────────────
+# Micro-batching (for concurrent requests)
+# ─────────────────────────────────────────────
+
+class PredictionBatcher:
+    """
+    Collects messages from requests that arrive at (almost) the same time
+    and scores them together in ONE scoring call per batch, instead of
+    one call per request.
+
+    HOW IT WORKS:
+    Requests put their word counts on a queue and wait on a Future. A single
+    background thread takes the first waiting message plus any others
+    already queued (up to `max_batch`), scores the whole batch and hands
+    each request its own probabilities. It never waits for more to arrive:
+    a lone request is scored at once, and requests that come in while a
+    batch is being scored simply form the next batch.
+    """
+
+    def __init__(self, max_batch=64):
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def predict_proba(self, word_counts: dict):
+        """Return the class probabilities for one message's word counts (blocks until scored)."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((word_counts, future))
+        return future.result()
+
+    def _ensure_started(self):
+        # Started lazily, so the thread runs in the process actually serving
+        # requests (a forking server does not carry threads into its workers).
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="prediction-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            rows = [word_counts for word_counts, _ in batch]
+
+            try:
+                probabilities = fast_predict_proba(rows)
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            for (_, future), probs in zip(batch, probabilities):
+                future.set_result(probs)
+
+
+PREDICTION_BATCHER = PredictionBatcher()
+
+
+# ─────────────────────────────────────────────
+# Prediction (cached)
+# ─────────────────────────────────────────────
+
+# Longest message /predict will analyze (characters)
+MAX_MESSAGE_LENGTH = 10_000
+
+# Identical messages (repeat submissions, bot probes, test traffic) are
+# answered from memory instead of re-running the model and all the scans.
+PREDICTION_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=PREDICTION_CACHE_SIZE)
+def classify_message(message: str):
+    """
+    Run the full analysis (ML prediction + explainability + intent) for a
+    stripped, non-empty message and return:
+      (prediction, confidence, suspicious_words, explanations, scammer_intent)
+
+    Results are cached per message, so everything returned is a tuple —
+    callers must copy before modifying.
+    """
+    # --- Single scan: model input + explainability inputs ---
+    word_counts, terms, has_url, has_symbols = analyze_message(message)
+
+    # --- ML Prediction ---
+    # 1. Score the word counts (batched with any concurrent requests)
+    probabilities = PREDICTION_BATCHER.predict_proba(word_counts)
+
+    # 2. Predicted class = the most probable one ("spam" or "ham")
+    best = probabilities.argmax()
+    prediction = CLASSES[best]
+
+    # Confidence = probability of the predicted class, as a percentage
+    confidence = round(float(probabilities[best]) * 100, 2)
+
+    # --- Explainability ---
+    suspicious_words, explanations = explain_message(message, terms, has_url, has_symbols)
+
+    # --- Scammer Intent Detection ---
+    scammer_intent = detect_scammer_intent(terms, has_url, prediction)
+
+    # If ham but suspicious words found, add a note
+    if prediction == "ham" and suspicious_words:
+        explanations.insert(0, "ℹ️ Model predicts HAM, but some suspicious patterns were found:")
+
+    # If spam with no pattern match, add a generic note
+    if prediction == "spam" and not explanations:
+        explanations.append("🤖 ML model detected spam patterns based on learned features.")
+
+    return (
+        prediction,
+        confidence,
+        tuple(suspicious_words),
+        tuple(explanations),
+        tuple(scammer_intent),
+    )
+
+
 # ─────────────────────────────────────────────
 # Routes
 # ─────────────────────────────────────────────
 
 @app.route("/")
-def index():
+async def index():
     """Serve the main HTML page."""
-    return render_template("index.html")
+    return await render_template("index.html")
 
 
 @app.route("/predict", methods=["POST"])
-def predict():
+async def predict():
     """
     Accept a JSON payload with a 'message' field.
     Returns a JSON response with:
@@ -236,60 +668,42 @@ def predict():
       - suspicious_words: list of flagged words
       - explanation     : list of reason strings
     """
-    data = request.get_json()
+    data = await request.get_json()
 
-    if not data or "message" not in data:
+    if not isinstance(data, dict) or "message" not in data:
         return jsonify({"error": "No message provided"}), 400
 
+    if not isinstance(data["message"], str):
+        return jsonify({"error": "Message must be a string"}), 400
+
     message = data["message"].strip()
 
     if not message:
         return jsonify({"error": "Message is empty"}), 400
 
-    # --- ML Prediction ---
-    # 1. Convert message to a word-count vector (same process as training)
-    message_vec = vectorizer.transform([message])
-
-    # 2. Predict class label ("spam" or "ham")
-    prediction = model.predict(message_vec)[0]
-
-    # 3. Get probability scores for both classes
-    probabilities = model.predict_proba(message_vec)[0]
+    if len(message) > MAX_MESSAGE_LENGTH:
+        return jsonify({"error": f"Message is too long (max {MAX_MESSAGE_LENGTH} characters)"}), 400
 
-    # 4. Map class labels to probabilities
-    classes = model.classes_.tolist()     # e.g., ["ham", "spam"]
-    prob_dict = dict(zip(classes, probabilities))
-
-    # Confidence = probability of the predicted class, as a percentage
-    confidence = round(prob_dict[prediction] * 100, 2)
-
-    # --- Explainability ---
-    suspicious_words, explanations = explain_message(message)
-
-    # --- Scammer Intent Detection ---
-    scammer_intent = detect_scammer_intent(message, prediction)
-
-    # If ham but suspicious words found, add a note
-    if prediction == "ham" and suspicious_words:
-        explanations.insert(0, "ℹ️ Model predicts HAM, but some suspicious patterns were found:")
+    # The analysis is CPU work that blocks (it waits on the micro-batcher),
+    # so run it on a worker thread and keep the event loop free meanwhile.
+    prediction, confidence, suspicious_words, explanations, scammer_intent = (
+        await asyncio.to_thread(classify_message, message)
+    )
 
-    # If spam with no pattern match, add a generic note
-    if prediction == "spam" and not explanations:
-        explanations.append("🤖 ML model detected spam patterns based on learned features.")
     # Build and return the JSON response
     response = {
-        "prediction":       prediction,        # "spam" or "ham"
-        "confidence":       confidence,         # e.g. 97.43
-        "suspicious_words": suspicious_words,   # ["free", "win", ...]
-        "explanation":      explanations,       # ["Contains keyword: free", ...]
-        "scammer_intent":   scammer_intent      # [{"icon": "💰", "goal": "Steal Money", ...}]
+        "prediction":       prediction,              # "spam" or "ham"
+        "confidence":       confidence,              # e.g. 97.43
+        "suspicious_words": list(suspicious_words),  # ["free", "win", ...]
+        "explanation":      list(explanations),      # ["Contains keyword: free", ...]
+        "scammer_intent":   list(scammer_intent)     # [{"icon": "💰", "goal": "Steal Money", ...}]
     }
 
     return jsonify(response)
 
 
 # ─────────────────────────────────────────────
-# Run the Flask development server
+# Run the development server
 # ─────────────────────────────────────────────
 if __name__ == "__main__":
     print("[START] Starting Spam Detector server at http://127.0.0.1:5000")
@@ -0,0 +1,12 @@
+"""
+asgi.py
+-------
+ASGI entry point for running the Spam Detector under a production server.
+
+    gunicorn asgi:app
+
+Settings (workers, worker class, preloading) live in gunicorn.conf.py,
+which gunicorn picks up automatically from the project folder.
+"""
+
+from app import app  # noqa: F401  (re-exported for the ASGI server)
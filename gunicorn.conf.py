@@ -0,0 +1,32 @@
+"""
+gunicorn.conf.py
+----------------
+Production server settings for the Spam Detector.
+
+Run from the project folder (this file is loaded automatically):
+    MALLOC_ARENA_MAX=2 gunicorn
+
+HOW IT WORKS (simple terms):
+- preload_app loads the model ONCE in the parent process,
+  before the workers are forked. Workers then share those pages with the
+  parent (copy-on-write) instead of each loading its own copy.
+- Each worker is a uvicorn event loop (uvloop + httptools when installed)
+  running the async app, so one worker keeps accepting and answering
+  requests while others are being analyzed on its thread pool. Those
+  concurrent requests are also micro-batched inside the worker.
+- MALLOC_ARENA_MAX=2 stops glibc from creating a memory arena per thread,
+  which keeps workers' thread pools from slowly bloating memory. It has to
+  be set in the environment BEFORE gunicorn starts, so it can't live in
+  this file.
+"""
+
+import multiprocessing
+
+wsgi_app = "asgi:app"
+bind = "0.0.0.0:5000"
+
+# Load app.py (and the model) once in the parent, then fork the workers
+preload_app = True
+
+workers = multiprocessing.cpu_count() * 2 + 1
+worker_class = "uvicorn_worker.UvicornWorker"
@@ -5,22 +5,26 @@ This script trains a Multinomial Naive Bayes spam classifier.
 
 HOW IT WORKS (simple terms):
 1. We load the spam.csv dataset (messages labeled "spam" or "ham")
-2. We convert text messages into numbers using CountVectorizer
-   (counts how many times each word appears — like a word frequency counter)
-3. We train a Naive Bayes model (a fast, effective text classifier)
-4. We save both the model and the vectorizer as .pkl files
-   so the Flask app can use them without re-training every time.
-
-Run this ONCE before starting the Flask app:
+2. We convert text messages into numbers using HashingVectorizer
+   (counts how many times each word appears — like a word frequency counter —
+   but files each word under a hashed slot instead of building a vocabulary)
+3. We train a Naive Bayes model (a fast, effective text classifier),
+   feeding it the training set in small batches
+4. We export what the app needs to score messages (the model's probability
+   tables and the hashing settings) to model.joblib, so the app can use them
+   without re-training — or even importing scikit-learn — every time.
+
+Run this ONCE before starting the Quart app:
     python train.py
 """
 
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
-import pickle
+import joblib
 import os
 
 # ─────────────────────────────────────────────
@@ -52,40 +56,64 @@ X_train, X_test, y_train, y_test = train_test_split(
 )
 
 # ─────────────────────────────────────────────
-# Step 4: Convert text to numbers using CountVectorizer
+# Step 4: Convert text to numbers using HashingVectorizer
 # ─────────────────────────────────────────────
-# CountVectorizer builds a vocabulary from all words
-# and represents each message as a word-count vector.
+# HashingVectorizer counts words like CountVectorizer, but instead of
+# learning a vocabulary it hashes each word straight to one of N_FEATURES
+# columns. It has nothing to learn, so memory stays constant however big the
+# dataset gets, and the model's size no longer depends on the corpus.
 print("\n[*] Vectorizing text (converting words to numbers)...")
 
-vectorizer = CountVectorizer(
-    lowercase=True,       # convert everything to lowercase
-    stop_words="english", # remove common words like "the", "is", "at"
+# Size the hash space to the corpus: roughly 10× its distinct words keeps
+# collisions rare (this dataset has ~370 words). Much bigger only dilutes
+# Naive Bayes' smoothing across empty slots and costs accuracy. Raise it
+# as the dataset grows.
+N_FEATURES = 2 ** 12    # 4,096 hashed word slots
+
+vectorizer = HashingVectorizer(
+    n_features=N_FEATURES,
+    lowercase=True,        # convert everything to lowercase
+    stop_words="english",  # remove common words like "the", "is", "at"
+    alternate_sign=False,  # keep counts positive (Naive Bayes needs that)
+    norm=None,             # raw word counts, like CountVectorizer
 )
 
-X_train_vec = vectorizer.fit_transform(X_train)  # learn vocab + transform train set
-X_test_vec  = vectorizer.transform(X_test)        # only transform test set (no learning)
-
-print(f"    Vocabulary size: {len(vectorizer.vocabulary_)} unique words")
+print(f"    Hashed feature space: {N_FEATURES} slots")
 
 # ─────────────────────────────────────────────
 # Step 5: Train the Naive Bayes model
 # ─────────────────────────────────────────────
 # MultinomialNB works great for word-count features.
 # It calculates the probability of a message being spam vs ham.
+# partial_fit lets us stream the training set through in small batches,
+# vectorizing only one batch at a time — a corpus far bigger than memory
+# trains exactly the same way.
 print("\n[*] Training Multinomial Naive Bayes model...")
 
-model = MultinomialNB()
-model.fit(X_train_vec, y_train)
+BATCH_SIZE = 1024
+CLASSES = ["ham", "spam"]
+
+# alpha is the smoothing added to every word count. The default of 1.0 is
+# too strong for a corpus this small; 0.1 brings accuracy back to that of
+# the old vocabulary-based model.
+model = MultinomialNB(alpha=0.1)
+batch_count = -(-len(X_train) // BATCH_SIZE)   # ceil division
+
+for batch in np.array_split(np.arange(len(X_train)), batch_count):
+    model.partial_fit(
+        vectorizer.transform(X_train.iloc[batch]),
+        y_train.iloc[batch],
+        classes=CLASSES,
+    )
 
-print("    Model trained successfully!")
+print(f"    Model trained successfully! ({batch_count} batches)")
 
 # ─────────────────────────────────────────────
 # Step 6: Evaluate the model
 # ─────────────────────────────────────────────
 print("\n[*] Evaluating model on test set...")
 
-y_pred = model.predict(X_test_vec)
+y_pred = model.predict(vectorizer.transform(X_test))
 accuracy = accuracy_score(y_test, y_pred)
 
 print(f"    Accuracy: {accuracy * 100:.2f}%")
@@ -93,18 +121,51 @@ print("\n   Detailed Report:")
 print(classification_report(y_test, y_pred))
 
 # ─────────────────────────────────────────────
-# Step 7: Save the model and vectorizer
+# Step 7: Export the model for serving
 # ─────────────────────────────────────────────
-# We use pickle to save Python objects to disk.
-# This way Flask can load them instantly without re-training.
-print("[*] Saving model and vectorizer...")
-
-with open("model.pkl", "wb") as f:
-    pickle.dump(model, f)
+# Scoring with Naive Bayes only needs a few tables, so instead of pickling
+# the scikit-learn objects we save just those, as plain Python/numpy data.
+# The app can then load them WITHOUT importing scikit-learn at all (much
+# faster startup, far less memory per server worker).
+# The file is small, so it is written UNCOMPRESSED for the quickest load.
+print("[*] Exporting model for serving...")
+
+joblib.dump(
+    {
+        "classes":          model.classes_.tolist(),  # ["ham", "spam"]
+        "class_log_prior":  model.class_log_prior_,   # log P(class)
+        "feature_log_prob": model.feature_log_prob_,  # log P(word | class)
+        "n_features":       N_FEATURES,               # hashed word slots
+        "stop_words":       sorted(vectorizer.get_stop_words()),
+        # Text settings the app must reproduce (it checks them at startup)
+        "token_pattern":    vectorizer.token_pattern,
+        "lowercase":        vectorizer.lowercase,
+        "alternate_sign":   vectorizer.alternate_sign,
+        "norm":             vectorizer.norm,
+    },
+    "model.joblib",
+    compress=0,
+)
 
-with open("vectorizer.pkl", "wb") as f:
-    pickle.dump(vectorizer, f)
+print("    model.joblib saved")
 
-print("    model.pkl saved")
-print("    vectorizer.pkl saved")
+# ─────────────────────────────────────────────
+# Step 8: Check the app reads messages the same way
+# ─────────────────────────────────────────────
+# The app hashes words itself (so it never imports scikit-learn). Make sure
+# its word counts are IDENTICAL to the vectorizer's for every message in the
+# dataset — otherwise the model would be scored on different input than it
+# was trained on.
+print("\n[*] Checking app.py's word counts against the vectorizer...")
+
+from app import analyze_message  # loads the model.joblib just saved
+
+X_all = vectorizer.transform(X)
+for i, message in enumerate(X):
+    row = X_all[i]
+    expected = dict(zip(row.indices.tolist(), row.data.astype(int).tolist()))
+    if dict(analyze_message(message)[0]) != expected:
+        raise SystemExit(f"❌ app.py counts words differently for: {message!r}")
+
+print(f"    All {len(X)} messages match")
 print("\n[DONE] Training complete! You can now run: python app.py")